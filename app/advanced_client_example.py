@@ -3,16 +3,70 @@ Advanced client examples for Audio Spoof Detection API
 Includes base64 encoding, batch processing, and error handling
 """
 
+import asyncio
+import random
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt import MultipartEncoder
+import aiohttp
 import json
 import base64
 from pathlib import Path
 from typing import Dict, List
-import time
+
+# SIMD-accelerated base64 decoding when available; otherwise use the
+# C routine directly, bypassing base64.b64decode's validation wrapper
+try:
+    import pybase64
+    _b64decode = pybase64.b64decode
+except ImportError:
+    import binascii
+
+    def _b64decode(data):
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        return binascii.a2b_base64(data)
 
 API_URL = "http://localhost:8000/detect"
 API_KEY = "your-secret-api-key-here"
 
+class TokenBucket:
+    """Token-bucket rate limiter that adapts to observed 429 responses"""
+
+    def __init__(self, rate: float = 5.0, capacity: int = 5):
+        self.rate = rate
+        self.max_rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.success_ewma = 1.0
+
+    def acquire(self):
+        """Take one token, sleeping only when the bucket is empty"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+
+            time.sleep((1.0 - self.tokens) / self.rate)
+
+    def record(self, throttled: bool):
+        """Update the success EWMA and shrink the rate when 429s spike"""
+        self.success_ewma = 0.8 * self.success_ewma + 0.2 * (0.0 if throttled else 1.0)
+
+        if throttled and self.success_ewma < 0.7:
+            self.rate = max(0.5, self.rate * 0.5)
+        elif not throttled and self.success_ewma > 0.95:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+
 class SpoofDetectionClient:
     """Client wrapper for the Audio Spoof Detection API"""
     
@@ -20,6 +74,56 @@ class SpoofDetectionClient:
         self.api_url = api_url
         self.api_key = api_key
         self.headers = {"X-API-Key": self.api_key}
+
+        # Persistent session: HTTP keep-alive + connection pooling avoids
+        # a fresh TCP (and TLS) handshake per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504]
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # 429s are handled here (adaptive limiter + Retry-After) rather
+        # than by the blind urllib3 retry above
+        self.limiter = TokenBucket(rate=5.0, capacity=5)
+
+    def _post_with_limit(self, make_kwargs=None, max_attempts: int = 4, **kwargs) -> requests.Response:
+        """
+        POST through the token bucket, backing off on 429 responses
+
+        Honors the server's Retry-After header when present; otherwise
+        uses exponential backoff with jitter. make_kwargs, when given, is
+        called before each attempt to rebuild the request kwargs — needed
+        for one-shot streaming bodies that cannot be rewound on retry.
+        """
+        for attempt in range(max_attempts):
+            self.limiter.acquire()
+            attempt_kwargs = make_kwargs() if make_kwargs is not None else kwargs
+            response = self.session.post(self.api_url, **attempt_kwargs)
+
+            if response.status_code != 429:
+                self.limiter.record(throttled=False)
+                return response
+
+            self.limiter.record(throttled=True)
+            retry_after = response.headers.get("Retry-After")
+            try:
+                # Retry-After may also be an HTTP-date; fall back to
+                # backoff when it isn't the delta-seconds form
+                wait = float(retry_after)
+            except (TypeError, ValueError):
+                wait = min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+            time.sleep(wait)
+
+        return response
     
     def detect_from_file(self, audio_path: str, language: str) -> Dict:
         """
@@ -32,22 +136,31 @@ class SpoofDetectionClient:
         Returns:
             API response dict
         """
+        audio_file = None
         try:
-            with open(audio_path, 'rb') as audio_file:
-                files = {'audio': (audio_path, audio_file, 'audio/wav')}
-                data = {'language': language}
-                
-                response = requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    files=files,
-                    data=data,
-                    timeout=30
-                )
-                
-                response.raise_for_status()
-                return response.json()
-                
+            # MultipartEncoder streams the file from disk in chunks, so
+            # memory stays bounded regardless of file size. The handle is
+            # reopened per attempt (one-shot body) and the previous one
+            # closed, so retries don't leak descriptors.
+            def make_kwargs():
+                nonlocal audio_file
+                if audio_file is not None:
+                    audio_file.close()
+                audio_file = open(audio_path, 'rb')
+                encoder = MultipartEncoder(fields={
+                    'language': language,
+                    'audio': (audio_path, audio_file, 'audio/wav')
+                })
+                return {
+                    'data': encoder,
+                    'headers': {'Content-Type': encoder.content_type},
+                    'timeout': 30
+                }
+
+            response = self._post_with_limit(make_kwargs=make_kwargs)
+            response.raise_for_status()
+            return response.json()
+
         except requests.exceptions.RequestException as e:
             return {
                 "status": "error",
@@ -58,6 +171,9 @@ class SpoofDetectionClient:
                 "status": "error",
                 "message": f"File not found: {audio_path}"
             }
+        finally:
+            if audio_file is not None:
+                audio_file.close()
     
     def detect_from_bytes(self, audio_bytes: bytes, language: str, filename: str = "audio.wav") -> Dict:
         """
@@ -74,10 +190,8 @@ class SpoofDetectionClient:
         try:
             files = {'audio': (filename, audio_bytes, 'audio/wav')}
             data = {'language': language}
-            
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
+
+            response = self._post_with_limit(
                 files=files,
                 data=data,
                 timeout=30
@@ -104,7 +218,7 @@ class SpoofDetectionClient:
             API response dict
         """
         try:
-            audio_bytes = base64.b64decode(audio_base64)
+            audio_bytes = _b64decode(audio_base64)
             return self.detect_from_bytes(audio_bytes, language)
         except Exception as e:
             return {
@@ -112,37 +226,83 @@ class SpoofDetectionClient:
                 "message": f"Base64 decode failed: {str(e)}"
             }
     
-    def batch_detect(self, audio_files: List[tuple], delay: float = 0.5) -> List[Dict]:
+    async def _detect_one(self, session: aiohttp.ClientSession, audio_path: str,
+                          language: str, sem: asyncio.Semaphore) -> Dict:
         """
-        Batch process multiple audio files
-        
+        Detect spoof for a single file over an aiohttp session
+
+        Args:
+            session: Shared aiohttp client session
+            audio_path: Path to audio file
+            language: Language of the audio
+            sem: Semaphore bounding in-flight requests
+
+        Returns:
+            Dict with "file" and "result" keys
+        """
+        async with sem:
+            try:
+                with open(audio_path, 'rb') as audio_file:
+                    form = aiohttp.FormData()
+                    form.add_field('language', language)
+                    form.add_field('audio', audio_file.read(),
+                                   filename=audio_path, content_type='audio/wav')
+
+                async with session.post(self.api_url, data=form,
+                                        timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    result = await response.json()
+
+            except FileNotFoundError:
+                result = {
+                    "status": "error",
+                    "message": f"File not found: {audio_path}"
+                }
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result = {
+                    "status": "error",
+                    "message": f"Request failed: {str(e)}"
+                }
+
+            return {"file": audio_path, "result": result}
+
+    async def batch_detect_async(self, audio_files: List[tuple], concurrency: int = 5) -> List[Dict]:
+        """
+        Batch process multiple audio files concurrently
+
         Args:
             audio_files: List of tuples (audio_path, language)
-            delay: Delay between requests in seconds
-            
+            concurrency: Maximum number of in-flight requests
+
         Returns:
             List of API responses
         """
-        results = []
-        
-        for audio_path, language in audio_files:
-            print(f"Processing: {audio_path} ({language})")
-            result = self.detect_from_file(audio_path, language)
-            results.append({
-                "file": audio_path,
-                "result": result
-            })
-            
-            # Avoid rate limiting
-            if delay > 0:
-                time.sleep(delay)
-        
-        return results
+        # The semaphore bounds in-flight requests, so no fixed inter-request
+        # sleep is needed; requests overlap instead of serializing
+        sem = asyncio.Semaphore(concurrency)
+
+        async with aiohttp.ClientSession(headers=self.headers) as session:
+            return list(await asyncio.gather(*[
+                self._detect_one(session, audio_path, language, sem)
+                for audio_path, language in audio_files
+            ]))
+
+    def batch_detect(self, audio_files: List[tuple], concurrency: int = 5) -> List[Dict]:
+        """
+        Synchronous wrapper around batch_detect_async
+
+        Args:
+            audio_files: List of tuples (audio_path, language)
+            concurrency: Maximum number of in-flight requests
+
+        Returns:
+            List of API responses
+        """
+        return asyncio.run(self.batch_detect_async(audio_files, concurrency=concurrency))
     
     def health_check(self) -> bool:
         """Check if API is healthy"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 self.api_url.replace("/detect", "/health"),
                 timeout=5
             )
@@ -197,7 +357,7 @@ if __name__ == "__main__":
         ("sample_hindi.wav", "Hindi"),
     ]
     
-    results = client.batch_detect(audio_files, delay=0.5)
+    results = client.batch_detect(audio_files, concurrency=5)
     
     print("\n" + "=" * 60)
     print("Batch Processing Summary")
@@ -9,6 +9,9 @@ import json
 API_URL = "http://localhost:8000/detect"
 API_KEY = "your-secret-api-key-here"  # Must match the server
 
+# Shared session keeps the TCP connection alive across requests
+SESSION = requests.Session()
+
 def detect_spoof(audio_file_path: str, language: str):
     """
     Send audio file to spoof detection API
@@ -36,7 +39,7 @@ def detect_spoof(audio_file_path: str, language: str):
         }
         
         # Make request
-        response = requests.post(API_URL, headers=headers, files=files, data=data)
+        response = SESSION.post(API_URL, headers=headers, files=files, data=data)
     
     return response.json()
 
@@ -0,0 +1,27 @@
+"""
+Shared pytest fixtures for the API test suite
+"""
+
+import pytest
+
+from test_api import _cached_wav_bytes
+
+
+@pytest.fixture(scope="session")
+def wav_1s_440():
+    """Serialized bytes of the default 1 s / 16 kHz / 440 Hz test WAV"""
+    return _cached_wav_bytes(1.0, 16000, 440)
+
+
+@pytest.fixture(scope="session")
+def sine_wav_path(tmp_path_factory):
+    """
+    Canonical 1 s / 16 kHz / 440 Hz test WAV, written to disk once
+
+    Tests that post the default audio can pass an open('rb') handle to
+    requests, which streams from the file descriptor instead of
+    materializing a fresh in-memory buffer per request.
+    """
+    path = tmp_path_factory.mktemp("wav") / "sine.wav"
+    path.write_bytes(_cached_wav_bytes(1.0, 16000, 440))
+    return path
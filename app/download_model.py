@@ -5,6 +5,7 @@ Use this if automatic download fails due to network/auth issues
 
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
 
@@ -18,12 +19,12 @@ MODEL_FILES = {
 
 SAVE_DIR = "pretrained_models/asvspoof-ecapa-tdnn"
 
-def download_file(url: str, dest_path: str):
+def download_file(session: requests.Session, url: str, dest_path: str):
     """Download a file with progress bar"""
     print(f"Downloading: {os.path.basename(dest_path)}")
-    
+
     try:
-        response = requests.get(url, stream=True, timeout=30)
+        response = session.get(url, stream=True, timeout=30)
         response.raise_for_status()
         
         total_size = int(response.headers.get('content-length', 0))
@@ -34,7 +35,9 @@ def download_file(url: str, dest_path: str):
             unit_scale=True,
             unit_divisor=1024,
         ) as pbar:
-            for chunk in response.iter_content(chunk_size=8192):
+            # 1 MiB chunks: far fewer Python iterations and tqdm updates
+            # than 8 KiB, and better sequential write batching
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
                 if chunk:
                     f.write(chunk)
                     pbar.update(len(chunk))
@@ -57,18 +60,28 @@ def main():
     print(f"\nSaving to: {os.path.abspath(SAVE_DIR)}\n")
     
     success_count = 0
+    to_download = {}
     for filename, url in MODEL_FILES.items():
         dest_path = os.path.join(SAVE_DIR, filename)
-        
+
         # Skip if already exists
         if os.path.exists(dest_path):
             print(f"⊙ Already exists: {filename}")
             success_count += 1
-            continue
-        
-        # Download
-        if download_file(url, dest_path):
-            success_count += 1
+        else:
+            to_download[filename] = (url, dest_path)
+
+    # Download concurrently: a shared session keeps connections alive
+    # while the thread pool overlaps TLS handshakes and server I/O
+    if to_download:
+        with requests.Session() as session, ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(download_file, session, url, dest_path): filename
+                for filename, (url, dest_path) in to_download.items()
+            }
+            for future in as_completed(futures):
+                if future.result():
+                    success_count += 1
     
     print("\n" + "="*60)
     print(f"Download Complete: {success_count}/{len(MODEL_FILES)} files")
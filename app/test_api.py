@@ -3,67 +3,157 @@ Test suite for Audio Spoof Detection API
 Run with: pytest test_api.py -v
 """
 
+import asyncio
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
-import wave
-import struct
+import json
 import math
+import numbers
+import struct
+import numpy as np
 
 # Test configuration
 API_URL = "http://127.0.0.1:8000"
 VALID_API_KEY = "your-secret-api-key-here"
 INVALID_API_KEY = "wrong-key"
 
+# Hoisted request constants: every detect test used to rebuild these
+# identical dicts and re-format the URL inline
+DETECT_URL = f"{API_URL}/detect"
+AUTH = {"X-API-Key": VALID_API_KEY}
+LANG_EN = {"language": "English"}
+
+# Shared session: connection pooling + keep-alive removes a TCP
+# handshake per request. The API key is deliberately NOT set as a
+# session default so the missing/invalid-key tests stay meaningful.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+SESSION.mount("http://", _adapter)
+
+# orjson's C parser beats stdlib json for response decoding, which adds
+# up across the suite (and under xdist); fall back when not installed
+try:
+    import orjson
+
+    def _json(response):
+        return orjson.loads(response.content)
+except ImportError:
+    def _json(response):
+        return response.json()
+
+# Streaming upload: requests copies file objects wholesale into the
+# multipart body, while MultipartEncoder feeds the socket in chunks and
+# keeps memory flat for the larger test payloads
+try:
+    from requests_toolbelt import MultipartEncoder
+
+    def _post_audio_streaming(buffer, language, filename="test.wav"):
+        encoder = MultipartEncoder(fields={
+            "language": language,
+            "audio": (filename, buffer, "audio/wav")
+        })
+        return SESSION.post(
+            DETECT_URL,
+            headers={**AUTH, "Content-Type": encoder.content_type},
+            data=encoder
+        )
+except ImportError:
+    def _post_audio_streaming(buffer, language, filename="test.wav"):
+        return SESSION.post(
+            DETECT_URL,
+            headers=AUTH,
+            files={"audio": (filename, buffer, "audio/wav")},
+            data={"language": language}
+        )
+
+def _wav_header(num_samples, sample_rate, num_channels=1, sample_width=2):
+    """Standard 44-byte RIFF header for 16-bit PCM"""
+    data_size = num_samples * num_channels * sample_width
+    byte_rate = sample_rate * num_channels * sample_width
+    block_align = num_channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, num_channels, sample_rate, byte_rate,
+        block_align, 8 * sample_width,
+        b'data', data_size
+    )
+
+@lru_cache(maxsize=32)
+def _cached_wav_bytes(duration, sample_rate, frequency):
+    """Render a sine WAV once per parameter combination"""
+    num_samples = int(duration * sample_rate)
+
+    # Generate sine wave from a one-period lookup table: the waveform
+    # repeats every sample_rate/gcd(frequency, sample_rate) samples, so
+    # evaluate sin() for one period and tile it to length
+    period = sample_rate // math.gcd(int(frequency), int(sample_rate))
+    omega = 2.0 * np.pi * frequency / sample_rate  # phase increment per sample
+    lut = (np.sin(omega * np.arange(period)) * 32767).astype('<i2')
+    samples = np.tile(lut, num_samples // period + 1)[:num_samples]
+
+    # RIFF header + PCM payload, no wave-module bookkeeping
+    return _wav_header(num_samples, sample_rate) + samples.tobytes()
+
 def generate_test_audio(duration=1.0, sample_rate=16000, frequency=440):
     """
     Generate a simple sine wave audio file for testing
-    
+
+    The serialized WAV is cached per parameter combination, so repeated
+    calls (nearly every test uses the defaults) only pay for a BytesIO
+    wrapper around the cached bytes.
+
     Args:
         duration: Duration in seconds
         sample_rate: Sample rate in Hz
         frequency: Frequency of sine wave in Hz
-    
+
     Returns:
         BytesIO object containing WAV file
     """
-    num_samples = int(duration * sample_rate)
-    
-    # Generate sine wave
-    samples = []
-    for i in range(num_samples):
-        sample = math.sin(2 * math.pi * frequency * i / sample_rate)
-        samples.append(int(sample * 32767))
-    
-    # Create WAV file in memory
-    buffer = BytesIO()
-    with wave.open(buffer, 'wb') as wav_file:
-        wav_file.setnchannels(1)  # Mono
-        wav_file.setsampwidth(2)  # 16-bit
-        wav_file.setframerate(sample_rate)
-        
-        # Write samples
-        for sample in samples:
-            wav_file.writeframes(struct.pack('h', sample))
-    
-    buffer.seek(0)
-    return buffer
+    return BytesIO(_cached_wav_bytes(duration, sample_rate, frequency))
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_api():
+    """
+    Hit /detect once before any test runs
+
+    The first request pays server-side cold-start costs (JIT compile,
+    caches, lazy imports); warming here means every assertion below
+    measures warm-path behavior only.
+    """
+    try:
+        SESSION.post(
+            DETECT_URL,
+            headers=AUTH,
+            files={"audio": ("warmup.wav", generate_test_audio(), "audio/wav")},
+            data={"language": "English"},
+            timeout=30
+        )
+    except requests.exceptions.RequestException:
+        # Server unreachable; let the individual tests report it
+        pass
+    yield
 
 class TestHealthEndpoint:
     """Test health check endpoint"""
     
     def test_health_check(self):
         """Test that health endpoint responds"""
-        response = requests.get(f"{API_URL}/health")
+        response = SESSION.get(f"{API_URL}/health")
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert "status" in data
         assert data["status"] == "healthy"
     
     def test_health_model_loaded(self):
         """Test that model is loaded"""
-        response = requests.get(f"{API_URL}/health")
-        data = response.json()
+        response = SESSION.get(f"{API_URL}/health")
+        data = _json(response)
         assert "model_loaded" in data
         # May be True or False depending on if model loaded successfully
 
@@ -72,9 +162,9 @@ class TestRootEndpoint:
     
     def test_root_endpoint(self):
         """Test that root endpoint returns API info"""
-        response = requests.get(f"{API_URL}/")
+        response = SESSION.get(f"{API_URL}/")
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert "message" in data
         assert "version" in data
         assert "endpoints" in data
@@ -82,23 +172,23 @@ class TestRootEndpoint:
 class TestDetectEndpoint:
     """Test detection endpoint"""
     
-    def test_detect_with_valid_audio(self):
+    def test_detect_with_valid_audio(self, wav_1s_440):
         """Test detection with valid audio and API key"""
-        audio = generate_test_audio()
+        audio = BytesIO(wav_1s_440)
         
-        headers = {"X-API-Key": VALID_API_KEY}
+        headers = AUTH
         files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
+        data = LANG_EN
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             files=files,
             data=data
         )
         
         assert response.status_code == 200
-        result = response.json()
+        result = _json(response)
         
         # Check response structure
         assert result["status"] == "success"
@@ -108,73 +198,75 @@ class TestDetectEndpoint:
         assert isinstance(result["explanation"], str)
         assert len(result["explanation"]) > 0
     
-    def test_detect_without_api_key(self):
+    def test_detect_without_api_key(self, wav_1s_440):
         """Test that missing API key is rejected"""
-        audio = generate_test_audio()
+        audio = BytesIO(wav_1s_440)
         
         files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
+        data = LANG_EN
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             files=files,
             data=data
         )
         
         assert response.status_code == 401
-        result = response.json()
+        result = _json(response)
         assert result["status"] == "error"
         assert "Invalid API key" in result["message"]
     
-    def test_detect_with_invalid_api_key(self):
+    def test_detect_with_invalid_api_key(self, wav_1s_440):
         """Test that invalid API key is rejected"""
-        audio = generate_test_audio()
+        audio = BytesIO(wav_1s_440)
         
         headers = {"X-API-Key": INVALID_API_KEY}
         files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
+        data = LANG_EN
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             files=files,
             data=data
         )
         
         assert response.status_code == 401
-        result = response.json()
+        result = _json(response)
         assert result["status"] == "error"
     
-    def test_detect_with_different_languages(self):
-        """Test detection with different languages"""
-        languages = ["Tamil", "English", "Hindi", "Malayalam", "Telugu"]
-        
-        for language in languages:
-            audio = generate_test_audio()
-            
-            headers = {"X-API-Key": VALID_API_KEY}
-            files = {"audio": ("test.wav", audio, "audio/wav")}
-            data = {"language": language}
-            
-            response = requests.post(
-                f"{API_URL}/detect",
-                headers=headers,
-                files=files,
-                data=data
-            )
-            
-            assert response.status_code == 200
-            result = response.json()
-            assert result["language"] == language
-            assert result["status"] == "success"
+    @pytest.mark.parametrize("language", ["Tamil", "English", "Hindi", "Malayalam", "Telugu"])
+    def test_detect_with_different_languages(self, language, wav_1s_440):
+        """Test detection with different languages
+
+        Parametrized (rather than a serial for-loop) so pytest-xdist can
+        spread the five requests across workers: pytest -n 5
+        """
+        audio = BytesIO(wav_1s_440)
+
+        headers = AUTH
+        files = {"audio": ("test.wav", audio, "audio/wav")}
+        data = {"language": language}
+
+        response = SESSION.post(
+            DETECT_URL,
+            headers=headers,
+            files=files,
+            data=data
+        )
+
+        assert response.status_code == 200
+        result = _json(response)
+        assert result["language"] == language
+        assert result["status"] == "success"
     
     def test_detect_without_audio_file(self):
         """Test that missing audio file is rejected"""
-        headers = {"X-API-Key": VALID_API_KEY}
-        data = {"language": "English"}
+        headers = AUTH
+        data = LANG_EN
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             data=data
         )
@@ -182,15 +274,15 @@ class TestDetectEndpoint:
         # FastAPI will return 422 for missing required field
         assert response.status_code == 422
     
-    def test_detect_without_language(self):
+    def test_detect_without_language(self, wav_1s_440):
         """Test that missing language parameter is rejected"""
-        audio = generate_test_audio()
+        audio = BytesIO(wav_1s_440)
         
-        headers = {"X-API-Key": VALID_API_KEY}
+        headers = AUTH
         files = {"audio": ("test.wav", audio, "audio/wav")}
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             files=files
         )
@@ -203,41 +295,163 @@ class TestDetectEndpoint:
         # Create a fake text file
         fake_file = BytesIO(b"This is not an audio file")
         
-        headers = {"X-API-Key": VALID_API_KEY}
+        headers = AUTH
         files = {"audio": ("test.txt", fake_file, "text/plain")}
-        data = {"language": "English"}
+        data = LANG_EN
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             files=files,
             data=data
         )
         
         assert response.status_code == 400
-        result = response.json()
+        result = _json(response)
         assert result["status"] == "error"
         assert "Invalid file type" in result["message"]
 
+def _detect_probes():
+    """
+    Build the independent /detect scenarios as (kwargs, expected statuses)
+
+    Mirrors the scenarios asserted one-by-one in TestDetectEndpoint;
+    bodies are rebuilt per call because BytesIO streams are one-shot.
+    """
+    auth = AUTH
+    return [
+        ({"headers": auth,
+          "files": {"audio": ("test.wav", generate_test_audio(), "audio/wav")},
+          "data": LANG_EN}, {200}),
+        ({"files": {"audio": ("test.wav", generate_test_audio(), "audio/wav")},
+          "data": LANG_EN}, {401}),
+        ({"headers": {"X-API-Key": INVALID_API_KEY},
+          "files": {"audio": ("test.wav", generate_test_audio(), "audio/wav")},
+          "data": LANG_EN}, {401}),
+        ({"headers": auth,
+          "data": LANG_EN}, {422}),
+        ({"headers": auth,
+          "files": {"audio": ("test.wav", generate_test_audio(), "audio/wav")}}, {422}),
+        ({"headers": auth,
+          "files": {"audio": ("test.txt", BytesIO(b"This is not an audio file"), "text/plain")},
+          "data": LANG_EN}, {400}),
+    ]
+
+class TestConcurrentProbes:
+    """Opt-in concurrent runner for the independent /detect scenarios"""
+
+    def test_detect_probes_concurrently(self):
+        """Issue all detect probes in parallel over the shared session"""
+        probes = _detect_probes()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(SESSION.post, DETECT_URL, **kwargs)
+                for kwargs, _ in probes
+            ]
+            responses = [future.result() for future in futures]
+
+        for (_, expected), response in zip(probes, responses):
+            assert response.status_code in expected, \
+                f"Expected one of {expected}, got {response.status_code}"
+
+class TestAsyncConcurrency:
+    """Concurrent detection over an async httpx client"""
+
+    def test_languages_concurrently_async(self):
+        """Fire the language matrix concurrently with asyncio.gather
+
+        Driven through asyncio.run so no pytest-asyncio plugin is
+        needed; skipped when httpx isn't installed.
+        """
+        httpx = pytest.importorskip("httpx")
+        languages = ["Tamil", "English", "Hindi", "Malayalam", "Telugu"]
+        wav_bytes = _cached_wav_bytes(1.0, 16000, 440)
+
+        async def run():
+            async with httpx.AsyncClient(
+                base_url=API_URL,
+                headers=AUTH,
+                timeout=30
+            ) as client:
+                return await asyncio.gather(*(
+                    client.post(
+                        "/detect",
+                        files={"audio": ("test.wav", wav_bytes, "audio/wav")},
+                        data={"language": language}
+                    )
+                    for language in languages
+                ))
+
+        responses = asyncio.run(run())
+
+        for language, response in zip(languages, responses):
+            assert response.status_code == 200
+            result = _json(response)
+            assert result["status"] == "success"
+            assert result["language"] == language
+
+class TestBatchEndpoint:
+    """Test batched detection endpoint"""
+
+    def test_detect_batch_languages(self):
+        """Batch the language probes into a single multi-file request"""
+        languages = ["Tamil", "English", "Hindi", "Malayalam", "Telugu"]
+        headers = AUTH
+
+        files = [
+            ("audio", (f"{i}.wav", generate_test_audio(), "audio/wav"))
+            for i in range(len(languages))
+        ]
+
+        response = SESSION.post(
+            f"{API_URL}/detect_batch",
+            headers=headers,
+            files=files,
+            data={"languages": json.dumps(languages)}
+        )
+
+        if response.status_code == 404:
+            # Older server without the batch endpoint: fall back to
+            # one request per item so this test stays portable
+            results = []
+            for language in languages:
+                single = SESSION.post(
+                    DETECT_URL,
+                    headers=headers,
+                    files={"audio": ("test.wav", generate_test_audio(), "audio/wav")},
+                    data={"language": language}
+                )
+                assert single.status_code == 200
+                results.append(_json(single))
+        else:
+            assert response.status_code == 200
+            results = _json(response)
+
+        assert len(results) == len(languages)
+        for language, result in zip(languages, results):
+            assert result["status"] == "success"
+            assert result["language"] == language
+
 class TestResponseFormat:
     """Test response format compliance"""
     
-    def test_success_response_format(self):
+    def test_success_response_format(self, sine_wav_path):
         """Test that success response has all required fields"""
-        audio = generate_test_audio()
-        
-        headers = {"X-API-Key": VALID_API_KEY}
-        files = {"audio": ("test.wav", audio, "audio/wav")}
+        headers = AUTH
         data = {"language": "Tamil"}
-        
-        response = requests.post(
-            f"{API_URL}/detect",
-            headers=headers,
-            files=files,
-            data=data
-        )
-        
-        result = response.json()
+
+        # Open file handle: requests streams from the descriptor rather
+        # than building a fresh in-memory WAV per request
+        with open(sine_wav_path, "rb") as audio:
+            response = SESSION.post(
+                DETECT_URL,
+                headers=headers,
+                files={"audio": ("test.wav", audio, "audio/wav")},
+                data=data
+            )
+
+        result = _json(response)
         
         # Required fields
         required_fields = ["status", "language", "classification", "confidenceScore", "explanation"]
@@ -248,23 +462,23 @@ class TestResponseFormat:
         assert isinstance(result["status"], str)
         assert isinstance(result["language"], str)
         assert isinstance(result["classification"], str)
-        assert isinstance(result["confidenceScore"], (int, float))
+        assert isinstance(result["confidenceScore"], numbers.Real)
         assert isinstance(result["explanation"], str)
     
     def test_error_response_format(self):
         """Test that error response has correct format"""
         headers = {"X-API-Key": INVALID_API_KEY}
         files = {"audio": ("test.wav", generate_test_audio(), "audio/wav")}
-        data = {"language": "English"}
+        data = LANG_EN
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             files=files,
             data=data
         )
         
-        result = response.json()
+        result = _json(response)
         
         # Required fields for error
         assert "status" in result
@@ -272,42 +486,38 @@ class TestResponseFormat:
         assert result["status"] == "error"
         assert isinstance(result["message"], str)
     
-    def test_confidence_score_range(self):
+    def test_confidence_score_range(self, sine_wav_path):
         """Test that confidence score is between 0 and 1"""
-        audio = generate_test_audio()
-        
-        headers = {"X-API-Key": VALID_API_KEY}
-        files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
-        
-        response = requests.post(
-            f"{API_URL}/detect",
-            headers=headers,
-            files=files,
-            data=data
-        )
-        
-        result = response.json()
+        headers = AUTH
+        data = LANG_EN
+
+        with open(sine_wav_path, "rb") as audio:
+            response = SESSION.post(
+                DETECT_URL,
+                headers=headers,
+                files={"audio": ("test.wav", audio, "audio/wav")},
+                data=data
+            )
+
+        result = _json(response)
         confidence = result["confidenceScore"]
         
         assert 0.0 <= confidence <= 1.0, f"Confidence score {confidence} out of range"
     
-    def test_classification_values(self):
+    def test_classification_values(self, sine_wav_path):
         """Test that classification is one of the expected values"""
-        audio = generate_test_audio()
-        
-        headers = {"X-API-Key": VALID_API_KEY}
-        files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
-        
-        response = requests.post(
-            f"{API_URL}/detect",
-            headers=headers,
-            files=files,
-            data=data
-        )
-        
-        result = response.json()
+        headers = AUTH
+        data = LANG_EN
+
+        with open(sine_wav_path, "rb") as audio:
+            response = SESSION.post(
+                DETECT_URL,
+                headers=headers,
+                files={"audio": ("test.wav", audio, "audio/wav")},
+                data=data
+            )
+
+        result = _json(response)
         classification = result["classification"]
         
         assert classification in ["AI_GENERATED", "HUMAN"], \
@@ -318,49 +528,27 @@ class TestEdgeCases:
     
     def test_very_short_audio(self):
         """Test with very short audio (0.1 seconds)"""
-        audio = generate_test_audio(duration=0.1)
-        
-        headers = {"X-API-Key": VALID_API_KEY}
-        files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
-        
-        response = requests.post(
-            f"{API_URL}/detect",
-            headers=headers,
-            files=files,
-            data=data
-        )
-        
+        response = _post_audio_streaming(generate_test_audio(duration=0.1), "English")
+
         # Should still work, even if accuracy may be lower
         assert response.status_code in [200, 500]  # May succeed or fail
-    
+
     def test_long_audio(self):
         """Test with longer audio (5 seconds)"""
-        audio = generate_test_audio(duration=5.0)
-        
-        headers = {"X-API-Key": VALID_API_KEY}
-        files = {"audio": ("test.wav", audio, "audio/wav")}
-        data = {"language": "English"}
-        
-        response = requests.post(
-            f"{API_URL}/detect",
-            headers=headers,
-            files=files,
-            data=data
-        )
-        
+        response = _post_audio_streaming(generate_test_audio(duration=5.0), "English")
+
         assert response.status_code == 200
     
-    def test_special_characters_in_language(self):
+    def test_special_characters_in_language(self, wav_1s_440):
         """Test with special characters in language field"""
-        audio = generate_test_audio()
+        audio = BytesIO(wav_1s_440)
         
-        headers = {"X-API-Key": VALID_API_KEY}
+        headers = AUTH
         files = {"audio": ("test.wav", audio, "audio/wav")}
         data = {"language": "தமிழ் (Tamil)"}  # Tamil script
         
-        response = requests.post(
-            f"{API_URL}/detect",
+        response = SESSION.post(
+            DETECT_URL,
             headers=headers,
             files=files,
             data=data
@@ -368,7 +556,7 @@ class TestEdgeCases:
         
         # Should accept any string for language
         assert response.status_code == 200
-        result = response.json()
+        result = _json(response)
         assert result["language"] == "தமிழ் (Tamil)"
 
 if __name__ == "__main__":